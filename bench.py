@@ -0,0 +1,225 @@
+import argparse
+import cProfile
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# render without a window and keep stdout clean, before pygame gets imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import engine  # noqa: E402
+
+ROOT = pathlib.Path(__file__).parent
+SEED: int = 0  # every benchmark plays the same games from one run to another
+GAMES: int = 200  # games played by the engine benchmark
+BATCH_SIZES: tuple[int, ...] = (256, 1024, 4096)
+FRAMES: int = 2000  # frames timed by the render benchmark
+REPEAT: int = 3  # best of REPEAT runs is kept
+THRESHOLD: float = 0.1  # relative slowdown reported as a regression
+
+
+class Results:
+    # name -> {"value", "unit", "higher_is_better"}, as written in the JSON
+    def __init__(self):
+        self.metrics: dict[str, dict] = {}
+
+    def add(self, name: str, value: float, unit: str, higher_is_better: bool):
+        self.metrics[name] = {
+            "value": value,
+            "unit": unit,
+            "higher_is_better": higher_is_better,
+        }
+
+    def report(self) -> str:
+        return "\n".join(
+            f"{name:<32} {metric['value']:>14.2f} {metric['unit']}"
+            for name, metric in self.metrics.items()
+        )
+
+
+def best(repeat: int, run) -> float:
+    # shortest wall-clock time of `run`, in seconds
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_engine(results: Results, repeat: int) -> None:
+    rounds = 0
+
+    def run():
+        nonlocal rounds
+        rounds = sum(
+            engine.Engine(seed).run_to_completion()[0]
+            for seed in range(SEED, SEED + GAMES)
+        )
+
+    elapsed = best(repeat, run)
+    results.add("engine.rounds_per_sec", rounds / elapsed, "rounds/s", True)
+    results.add("engine.ns_per_round", elapsed / rounds * 1e9, "ns", False)
+
+
+def bench_batch(results: Results, repeat: int) -> None:
+    import batch
+
+    for size in BATCH_SIZES:
+        elapsed = best(
+            repeat, lambda: batch.BatchEngine(size, SEED).run_to_completion()
+        )
+        results.add(f"batch.{size}.games_per_sec", size / elapsed, "games/s", True)
+
+
+def render_pass(main, name: str) -> float:
+    # time `name` over FRAMES states of seeded games, in seconds
+    seed = SEED
+    game = main.Game(seed=seed)
+    elapsed = 0.0
+    for _ in range(FRAMES):
+        if not game.engine.advance():
+            seed += 1
+            game = main.Game(seed=seed)
+        start = time.perf_counter()
+        getattr(game, name)()
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def frame_pass(main) -> float:
+    # time FRAMES frames of the mainloop, dirty rects included, in seconds
+    game = main.Game(seed=SEED)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        game.give_or_battle()
+        game.check_victory()
+        game.render()
+    return time.perf_counter() - start
+
+
+def bench_render(results: Results, repeat: int) -> None:
+    import pygame
+
+    import main
+
+    for name in ("render_decks", "render_piles"):
+        elapsed = min(render_pass(main, name) for _ in range(repeat))
+        results.add(f"render.{name}_us", elapsed / FRAMES * 1e6, "us", False)
+
+    game = main.Game(seed=SEED)
+    game.engine.run_to_completion()
+    elapsed = best(repeat, lambda: [game.render_victory() for _ in range(FRAMES)])
+    results.add("render.render_victory_us", elapsed / FRAMES * 1e6, "us", False)
+
+    elapsed = min(frame_pass(main) for _ in range(repeat))
+    results.add("render.frame_us", elapsed / FRAMES * 1e6, "us", False)
+    pygame.quit()
+
+
+def bench_import(results: Results, repeat: int) -> None:
+    # in a fresh interpreter, so nothing is already imported
+    code = (
+        "import time; start = time.perf_counter(); import {module}; "
+        "imported = time.perf_counter(); {setup}; "
+        "print(imported - start, time.perf_counter() - imported)"
+    )
+    for module, setup in (("engine", "engine.Engine(0)"), ("main", "main.Game()")):
+        runs = [
+            subprocess.run(
+                [sys.executable, "-c", code.format(module=module, setup=setup)],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+            for _ in range(repeat)
+        ]
+        imported = min(float(run[0]) for run in runs)
+        started = min(float(run[1]) for run in runs)
+        results.add(f"import.{module}_ms", imported * 1e3, "ms", False)
+        results.add(f"startup.{module}_ms", started * 1e3, "ms", False)
+
+
+BENCHMARKS = {
+    "engine": bench_engine,
+    "batch": bench_batch,
+    "render": bench_render,
+    "import": bench_import,
+}
+
+
+def regressions(results: Results, baseline: dict, threshold: float) -> list[str]:
+    found = []
+    for name, metric in results.metrics.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["value"], metric["value"]
+        if not before:  # no relative change from zero
+            continue
+        change = (after - before) / before
+        if metric["higher_is_better"]:
+            change = -change
+        if change > threshold:
+            found.append(f"{name}: {before:.2f} -> {after:.2f} {metric['unit']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engines and renderer.")
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"any of {', '.join(BENCHMARKS)}, all by default"
+    )
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="report peak memory, timings get slower",
+    )
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+    results = Results()
+    profiler = cProfile.Profile() if args.profile else None
+    for name in args.benchmarks or BENCHMARKS:
+        if args.tracemalloc:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        BENCHMARKS[name](results, args.repeat)
+        if profiler:
+            profiler.disable()
+        if args.tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.add(f"{name}.peak_memory_kb", peak / 1024, "KiB", False)
+
+    print(results.report())
+    if profiler:
+        profiler.dump_stats(args.profile)
+    if args.json:
+        output = {"seed": SEED, "metrics": results.metrics}
+        pathlib.Path(args.json).write_text(json.dumps(output, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(pathlib.Path(args.baseline).read_text())["metrics"]
+        found = regressions(results, baseline, args.threshold)
+        for regression in found:
+            print(f"regression {regression}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
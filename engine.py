@@ -0,0 +1,132 @@
+import random
+from collections import deque
+from collections.abc import Iterable
+
+BLACK: str = "Black"
+RED: str = "Red"
+DRAW: str = "Draw"  # stopped by max_rounds
+CYCLE: str = "Cycle"  # stopped on a repeated state
+DECK_SIZE: int = 52
+SEEN_LIMIT: int = 100_000  # states remembered by the cycle detection
+
+# a card is its index in the sprite sheet: row * 13 + col, 14 for aces
+VALUES: tuple[int, ...] = tuple(
+    14 if col == 0 else col + 1 for row in range(4) for col in range(13)
+)
+
+
+class Pile:
+    def __init__(self, cards: Iterable[int] = ()):
+        self.cards = deque(cards)  # top of the pile on the left
+
+    def last(self) -> int:
+        return self.cards[-1]
+
+    @property
+    def size(self):
+        return len(self.cards)
+
+
+class Engine:
+    def __init__(
+        self,
+        seed: int | None = None,
+        max_rounds: int | None = None,
+        shuffle: bool = True,
+        detect_cycles: bool = False,
+    ):
+        if detect_cycles and shuffle:
+            raise ValueError("cycles can only be detected when shuffle is False")
+        self.random = random.Random(seed)
+        self.max_rounds = max_rounds
+        self.shuffle = shuffle  # shuffle won cards, else winner pile first
+        self.detect_cycles = detect_cycles
+        self.seen: set[bytes] = set()
+
+        self.rounds = 0
+        self.wars = 0
+        self.winner = None
+
+        self.black_deck, self.red_deck = self.create_decks()
+        self.black_pile, self.red_pile = Pile(), Pile()
+
+    def create_decks(self) -> tuple[Pile, Pile]:
+        cards = list(range(DECK_SIZE))
+        self.random.shuffle(cards)
+        return Pile(cards[len(cards) // 2 :]), Pile(cards[: len(cards) // 2])
+
+    def step(self) -> None:
+        black_deck, red_deck = self.black_deck.cards, self.red_deck.cards
+        black_pile, red_pile = self.black_pile.cards, self.red_pile.cards
+        try:
+            # insufficient number of cards on pile
+            if not (len(black_pile) % 2 and len(red_pile) % 2):
+                black_pile.append(black_deck.popleft())
+                red_pile.append(red_deck.popleft())
+                return
+
+            self.rounds += 1
+            black, red = VALUES[black_pile[-1]], VALUES[red_pile[-1]]
+
+            # equality
+            if black == red:
+                self.wars += 1
+                black_pile.append(black_deck.popleft())
+                red_pile.append(red_deck.popleft())
+                return
+
+            # black win
+            if black > red:
+                winner, cards = black_deck, [*black_pile, *red_pile]
+            # red win
+            else:
+                winner, cards = red_deck, [*red_pile, *black_pile]
+            if self.shuffle:
+                self.random.shuffle(cards)
+            winner.extend(cards)
+            black_pile.clear()
+            red_pile.clear()
+
+        except IndexError:  # happen when no card to add
+            black_deck.extend(black_pile)
+            red_deck.extend(red_pile)
+            black_pile.clear()
+            red_pile.clear()
+
+    def check_victory(self) -> str | None:
+        if self.red_deck.size == DECK_SIZE:
+            self.winner = RED
+        if self.black_deck.size == DECK_SIZE:
+            self.winner = BLACK
+
+        if self.winner is None and self.detect_cycles:
+            self.check_cycle()
+        if self.winner is None and self.max_rounds is not None:
+            if self.rounds >= self.max_rounds:
+                self.winner = DRAW
+        return self.winner
+
+    def check_cycle(self) -> None:
+        # only compare states between rounds, when both piles are empty
+        if self.black_pile.cards or self.red_pile.cards:
+            return
+        black = self.black_deck.cards
+        state = bytes((len(black), *black, *self.red_deck.cards))
+        if state in self.seen:
+            self.winner = CYCLE
+            return
+        # forgetting everything keeps memory bounded, a cycle shorter than
+        # SEEN_LIMIT rounds is still caught on one of its next laps
+        if len(self.seen) >= SEEN_LIMIT:
+            self.seen.clear()
+        self.seen.add(state)
+
+    def advance(self) -> bool:
+        # play one step, return False once the game is over
+        self.step()
+        return self.check_victory() is None
+
+    def run_to_completion(self) -> tuple[int, str]:
+        while self.winner is None and self.advance():
+            pass
+        return self.rounds, self.winner
@@ -1,40 +1,87 @@
+import functools
 import pathlib
-import random
+import time
 
 import pygame
 
+import engine
+
 FPS: int = 120
-SPEED: float = 0  # time between each card, must be non negative
+SPEED: float = 0  # time between each card, must be non negative, 0 for turbo
+TURBO_STEPS: int = 1000  # cards moved between two frames in turbo mode
+MAX_ROUNDS: int | None = None  # declare a draw after this many rounds
+LABELS: int = 64  # deck count labels kept by the render cache
+BACKGROUND: str = "#FC8EAC"
 SPRITES = pathlib.Path(__file__).parent / "asset" / "CuteCards.png"
 
 
 class Card:
     w = 100
     h = 144
-    sprite = pygame.image.load(SPRITES)
+    sprite: pygame.Surface = None  # loaded by Game, once the display exists
 
-    def __init__(self, value: int, image: pygame.Rect):
-        self.value = value
-        self.image = image  # portion of SPRITES to display
+    @staticmethod
+    def image(card: int) -> pygame.Rect:
+        # portion of SPRITES to display for an engine card
+        row, col = divmod(card, 13)
+        return pygame.Rect(col * Card.w, row * Card.h, Card.w, Card.h)
 
 
 class Pile:
     def __init__(
         self,
-        cards: list[Card],
+        stack: engine.Pile,
         pos: tuple[int, int],
         image: pygame.Rect,
     ):
-        self.cards = cards
+        self.stack = stack  # cards are owned by the engine
         self.image = image  # portion of SPRITES to display
         self.pos = pos
 
+    @property
+    def cards(self):
+        return self.stack.cards
+
     def last(self):
-        return self.cards[-1]
+        return self.stack.last()
 
     @property
     def size(self):
-        return len(self.cards)
+        return self.stack.size
+
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(self.pos, (Card.w, Card.h))
+
+
+class RenderCache:
+    # everything the render methods used to rebuild on each frame, must be
+    # created after pygame.init and pygame.display.set_mode
+    def __init__(self):
+        self.deck_font = pygame.font.SysFont("aria", Card.w // 3)
+        self.victory_font = pygame.font.SysFont("aria", Card.w // 4)
+
+        sheet = Card.sprite.convert_alpha()
+        self.sheet = sheet
+        self.faces = [
+            sheet.subsurface(Card.image(card)) for card in range(engine.DECK_SIZE)
+        ]
+        self.backs: dict[tuple[int, int, int, int], pygame.Surface] = {}
+
+        self.label = functools.lru_cache(maxsize=LABELS)(self.render_label)
+        self.banner = functools.lru_cache(maxsize=1)(self.render_banner)
+
+    def back(self, image: pygame.Rect) -> pygame.Surface:
+        key = tuple(image)
+        if key not in self.backs:
+            self.backs[key] = self.sheet.subsurface(image)
+        return self.backs[key]
+
+    def render_label(self, count: int) -> pygame.Surface:
+        return self.deck_font.render(f"{count}", 1, (0, 0, 0))
+
+    def render_banner(self, text: str) -> pygame.Surface:
+        return self.victory_font.render(text, 1, (0, 0, 0))
 
 
 class Game:
@@ -44,138 +91,141 @@ class Game:
         size: tuple[int, int] = (3 * Card.w, 2 * Card.h),
         speed: int = 0.5,
         auto_close: bool = False,
+        seed: int | None = None,
+        max_rounds: int | None = None,
+        turbo_steps: int = TURBO_STEPS,
+        simulation: engine.Engine | None = None,
     ):
+        pygame.init()
         pygame.display.set_caption("War")
         self.surface = pygame.display.set_mode(size)
         self.width, self.height = size
+        if Card.sprite is None:
+            Card.sprite = pygame.image.load(SPRITES)
+        self.cache = RenderCache()
 
         self.clock = pygame.time.Clock()
         self.fps = fps
         self.speed = speed  # time to wait between each card
-        self.remaining_pause = 0  # used to pause the mainloop
-
-        self.rounds = 0
-        self.winner = None
+        self.lag = 0.0  # simulated time owed by the mainloop, in seconds
+        self.turbo = not speed  # move turbo_steps cards between frames
+        self.turbo_steps = turbo_steps
 
         self.running = True
         self.auto_close = auto_close
 
+        # a given simulation, like a replay, is rendered from its current state
+        self.engine = simulation or engine.Engine(seed, max_rounds)
         self.black_deck, self.red_deck = self.create_decks()
         self.black_pile, self.red_pile = self.create_pile()
+        self.piles = (self.black_deck, self.red_deck, self.black_pile, self.red_pile)
+
+        # regions to redraw on the next frame, everything on the first one
+        self.dirty: set[Pile] = set()
+        self.redraw = True
+        self.victory_shown = False
+
+        # frame-time counters, render_time only covers rendered frames
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.render_time = 0.0
+
+    @property
+    def rounds(self) -> int:
+        return self.engine.rounds
+
+    @property
+    def winner(self) -> str | None:
+        return self.engine.winner
 
     def create_pile(self) -> tuple[Pile, Pile]:
         pile_black = Pile(
-            [],
+            self.engine.black_pile,
             (self.width // 2 - Card.w // 2, self.height // 2 - Card.h),
             pygame.Rect(14 * Card.w, 2 * Card.h, Card.w, Card.h),
         )
         pile_red = Pile(
-            [],
+            self.engine.red_pile,
             (self.width // 2 - Card.w // 2, self.height // 2),
             pygame.Rect(14 * Card.w, 3 * Card.h, Card.w, Card.h),
         )
         return pile_black, pile_red
 
     def create_decks(self) -> tuple[Pile, Pile]:
-        # generate the cards and shuffle them
-        cards = []
-        for row in range(4):
-            for col in range(13):
-                value = 14 if col + 1 == 1 else col + 1  # 14 for aces
-                image = (col * Card.w, row * Card.h, Card.w, Card.h)
-                cards.append(Card(value, image))
-        random.shuffle(cards)
-
-        # split the cards into two Pile object
+        # the engine deals the cards, wrap them for rendering
         deck_black = Pile(
-            cards[len(cards) // 2 :],
+            self.engine.black_deck,
             (0, 0),
             pygame.Rect(14 * Card.w, 2 * Card.h, Card.w, Card.h),
         )
         deck_red = Pile(
-            cards[: len(cards) // 2],
+            self.engine.red_deck,
             (self.width - Card.w, self.height - Card.h),
             pygame.Rect(14 * Card.w, 3 * Card.h, Card.w, Card.h),
         )
 
         return deck_black, deck_red
 
-    def pause(self, seconds: int = None) -> bool:
-        if seconds:
-            self.remaining_pause = seconds * self.fps
-        if self.remaining_pause:
-            self.remaining_pause -= 1
-            return True
-        return False
+    def steps_due(self, elapsed: float) -> int:
+        # number of cards to move for `elapsed` seconds of wall-clock time
+        if self.turbo:
+            return self.turbo_steps
+        if not self.speed:
+            return 1
+        self.lag += elapsed
+        steps = int(self.lag // self.speed)
+        self.lag -= steps * self.speed
+        if steps > self.turbo_steps:  # too far behind, do not try to catch up
+            steps, self.lag = self.turbo_steps, 0.0
+        return steps
 
     def give_or_battle(self) -> None:
-        try:
-            # insufficient number of cards on pile
-            if not (self.black_pile.size % 2 and self.red_pile.size % 2):
-                self.black_pile.cards.append(self.black_deck.cards.pop(0))
-                self.red_pile.cards.append(self.red_deck.cards.pop(0))
-
-            # equality
-            elif self.black_pile.last().value == self.red_pile.last().value:
-                self.rounds += 1
-                self.black_pile.cards.append(self.black_deck.cards.pop(0))
-                self.red_pile.cards.append(self.red_deck.cards.pop(0))
-
-            # black win
-            elif self.black_pile.last().value > self.red_pile.last().value:
-                self.rounds += 1
-                cards = self.black_pile.cards + self.red_pile.cards
-                random.shuffle(cards)
-                self.black_deck.cards.extend(cards)
-                self.black_pile.cards, self.red_pile.cards = [], []
-
-            # red win
-            elif self.black_pile.last().value < self.red_pile.last().value:
-                self.rounds += 1
-                cards = self.red_pile.cards + self.black_pile.cards
-                random.shuffle(cards)
-                self.red_deck.cards.extend(cards)
-                self.black_pile.cards, self.red_pile.cards = [], []
-
-        except IndexError:  # happen when no card to add
-            self.black_deck.cards.extend(self.black_pile.cards)
-            self.red_deck.cards.extend(self.red_pile.cards)
-            self.black_pile.cards.clear()
-            self.red_pile.cards.clear()
-        self.pause(self.speed)
+        sizes = [pile.size for pile in self.piles]
+        self.engine.step()
+        # piles only grow or get emptied, a size change covers every move
+        for pile, size in zip(self.piles, sizes):
+            if pile.size != size:
+                self.dirty.add(pile)
+
+    def render_deck(self, deck: Pile):
+        label = self.cache.label(deck.size)
+
+        # create the rect for the label and the square
+        label_rect = label.get_rect()
+        square = pygame.Rect(0, 0, 40, 40)
+
+        # draw the deck
+        deck_rect = self.surface.blit(self.cache.back(deck.image), deck.pos)
+        # center the label and the square to the deck
+        label_rect.center = deck_rect.center
+        square.center = deck_rect.center
+        # draw the square and the label
+        pygame.draw.rect(self.surface, "white", square, border_radius=10)
+        pygame.draw.rect(self.surface, "black", square, 4, 10)
+        self.surface.blit(label, (label_rect.topleft))
 
     def render_decks(self):
         for deck in (self.black_deck, self.red_deck):
-            font = pygame.font.SysFont("aria", Card.w // 3)
-            label = font.render(f"{len(deck.cards)}", 1, (0, 0, 0))
-
-            # create the rect for the label and the square
-            label_rect = label.get_rect()
-            square = pygame.Rect(0, 0, 40, 40)
-
-            # draw the deck
-            deck_rect = self.surface.blit(Card.sprite, deck.pos, deck.image)
-            # center the label and the square to the deck
-            label_rect.center = deck_rect.center
-            square.center = deck_rect.center
-            # draw the square and the label
-            pygame.draw.rect(self.surface, "white", square, border_radius=10)
-            pygame.draw.rect(self.surface, "black", square, 4, 10)
-            self.surface.blit(label, (label_rect.topleft))
+            self.render_deck(deck)
+
+    def render_pile(self, pile: Pile):
+        if not pile.cards:
+            return
+        if len(pile.cards) % 2:
+            self.surface.blit(self.cache.faces[pile.last()], pile.pos)
+        else:  # render cards face down
+            self.surface.blit(self.cache.back(pile.image), pile.pos)
 
     def render_piles(self):
         for pile in (self.red_pile, self.black_pile):
-            if not pile.cards:
-                continue
-            if len(pile.cards) % 2:
-                self.surface.blit(Card.sprite, pile.pos, pile.cards[-1].image)
-            else:  # render cards face down
-                self.surface.blit(Card.sprite, pile.pos, pile.image)
-
-    def render_victory(self):
-        font = pygame.font.SysFont("aria", Card.w // 4)
-        text = f"{self.winner} has won after {self.rounds} rounds"
-        label = font.render(text, 1, (0, 0, 0))
+            self.render_pile(pile)
+
+    def render_victory(self) -> pygame.Rect:
+        if self.winner in (engine.DRAW, engine.CYCLE):
+            text = f"{self.winner} after {self.rounds} rounds"
+        else:
+            text = f"{self.winner} has won after {self.rounds} rounds"
+        label = self.cache.banner(text)
 
         # retrieve rect
         label_rect = label.get_rect()
@@ -189,13 +239,10 @@ class Game:
         pygame.draw.rect(self.surface, "white", square, border_radius=10)
         pygame.draw.rect(self.surface, "black", square, 4, border_radius=10)
         self.surface.blit(label, label_rect)
+        return square
 
     def check_victory(self):
-        if self.red_deck.size == 52:
-            self.winner = "Red"
-        if self.black_deck.size == 52:
-            self.winner = "Black"
-
+        self.engine.check_victory()
         if self.winner and self.auto_close:
             self.running = False
 
@@ -206,35 +253,67 @@ class Game:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
+                if event.key == pygame.K_f:  # fast-forward
+                    self.turbo = not self.turbo
+                    self.lag = 0.0
+            if event.type == pygame.WINDOWEXPOSED:
+                self.redraw = True
+
+    def render(self) -> None:
+        # redraw and update only the regions that changed since last frame
+        start = time.perf_counter()
+        if self.redraw:
+            self.surface.fill(BACKGROUND)
+            self.render_decks()
+            self.render_piles()
+            rects = [self.surface.get_rect()]
+            self.victory_shown = False
+        else:
+            rects = []
+            for pile in self.dirty:
+                self.surface.fill(BACKGROUND, pile.rect)
+                if pile in (self.black_deck, self.red_deck):
+                    self.render_deck(pile)
+                else:
+                    self.render_pile(pile)
+                rects.append(pile.rect)
+        if self.winner and not self.victory_shown:
+            rects.append(self.render_victory())
+            self.victory_shown = True
+        self.dirty.clear()
+        self.redraw = False
+
+        if not rects:
+            self.frames_skipped += 1
+            return
+        pygame.display.update(rects)
+        self.frames_rendered += 1
+        self.render_time += time.perf_counter() - start
 
     def run(self) -> int:
-        pygame.init()
+        previous = time.perf_counter()
         while self.running:
-            self.clock.tick(self.fps)
+            # turbo renders as often as the simulation allows
+            if not self.turbo or self.winner:
+                self.clock.tick(self.fps)
             self.handle_events()
 
-            if self.winner:
-                self.render_victory()
-                pygame.display.update()
-                continue
+            now = time.perf_counter()
+            for _ in range(self.steps_due(now - previous)):
+                if self.winner:
+                    break
+                self.give_or_battle()
+                self.check_victory()
+            previous = now
 
-            if self.pause():
-                continue
-
-            self.give_or_battle()
-            self.check_victory()
-
-            self.surface.fill("#FC8EAC")
-            self.render_decks()
-            self.render_piles()
-            pygame.display.update()
+            self.render()
 
         pygame.quit()
         return self.rounds
 
 
 def main():
-    game = Game(speed=SPEED, fps=FPS, auto_close=False)
+    game = Game(speed=SPEED, fps=FPS, auto_close=False, max_rounds=MAX_ROUNDS)
     game.run()
 
 
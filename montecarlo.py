@@ -0,0 +1,197 @@
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+import numpy as np
+
+import batch
+
+CHUNK_SIZE: int = 10_000  # games played by a worker per task
+TOP: int = 10  # number of longest games to report
+MAX_ROUNDS: int = 100_000  # games still running are counted as draws
+
+
+class Summary:
+    """Aggregate of many games, small enough to send back from a worker."""
+
+    def __init__(self, top: int = TOP):
+        self.games = 0
+        self.wins = np.zeros(len(batch.WINNERS), dtype=np.int64)
+        self.rounds = np.zeros(0, dtype=np.int64)  # histogram of rounds
+        self.wars = np.zeros(0, dtype=np.int64)  # histogram of wars per game
+        self.top = top
+        self.longest: list[tuple[int, int]] = []  # (rounds, game) pairs
+
+    @staticmethod
+    def _add_histogram(total: np.ndarray, other: np.ndarray) -> np.ndarray:
+        if other.size > total.size:
+            total, other = other, total
+        total = total.copy()
+        total[: other.size] += other
+        return total
+
+    def add(
+        self, first_game: int, rounds: np.ndarray, wars: np.ndarray, winner: np.ndarray
+    ) -> None:
+        self.games += rounds.size
+        self.wins += np.bincount(winner, minlength=self.wins.size)
+        self.rounds = self._add_histogram(self.rounds, np.bincount(rounds))
+        self.wars = self._add_histogram(self.wars, np.bincount(wars))
+
+        longest = np.argsort(-rounds, kind="stable")[: self.top]
+        self._keep_longest([(int(rounds[i]), first_game + int(i)) for i in longest])
+
+    def merge(self, other: "Summary") -> None:
+        self.games += other.games
+        self.wins += other.wins
+        self.rounds = self._add_histogram(self.rounds, other.rounds)
+        self.wars = self._add_histogram(self.wars, other.wars)
+        self._keep_longest(other.longest)
+
+    def _keep_longest(self, games: list[tuple[int, int]]) -> None:
+        # longest first, ties broken by game number so merge order is irrelevant
+        games = self.longest + games
+        self.longest = sorted(games, key=lambda game: (-game[0], game[1]))[: self.top]
+
+    def percentile(self, q: float) -> int:
+        cumulative = np.cumsum(self.rounds)
+        return int(np.searchsorted(cumulative, q / 100 * cumulative[-1]))
+
+    def report(self) -> str:
+        if not self.games:
+            return "games: 0"
+        count = np.arange(self.rounds.size)
+        lines = [
+            f"games: {self.games}",
+            *(
+                f"{name}: {wins} ({wins / self.games:.2%})"
+                for name, wins in zip(batch.WINNERS, self.wins)
+            ),
+            f"rounds: mean {(count * self.rounds).sum() / self.games:.1f}, "
+            f"median {self.percentile(50)}, p99 {self.percentile(99)}, "
+            f"max {self.rounds.size - 1}",
+            f"wars: {(np.arange(self.wars.size) * self.wars).sum()} total, "
+            f"{self.games - self.wars[0]} games with at least one",
+            "longest games: "
+            + ", ".join(f"#{game} ({rounds})" for rounds, game in self.longest),
+        ]
+        return "\n".join(lines)
+
+
+def play_chunk(
+    master_seed: int,
+    chunk: int,
+    chunk_size: int,
+    games: int,
+    top: int,
+    max_rounds: int | None,
+) -> Summary:
+    # the seed of a chunk only depends on its number, so the results do not
+    # depend on how chunks are spread over the workers
+    seed = np.random.SeedSequence(master_seed, spawn_key=(chunk,))
+    first_game = chunk * chunk_size
+    count = min(chunk_size, games - first_game)
+
+    engine = batch.BatchEngine(count, seed, max_rounds)
+    rounds, winner = engine.run_to_completion()
+
+    summary = Summary(top)
+    summary.add(first_game, rounds, engine.wars, winner)
+    return summary
+
+
+def run(
+    games: int,
+    master_seed: int,
+    workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    top: int = TOP,
+    max_rounds: int | None = MAX_ROUNDS,
+    progress: bool = True,
+) -> Summary:
+    chunks = -(-games // chunk_size)
+    workers = workers or os.cpu_count()
+    summary = Summary(top)
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # keep a bounded number of chunks in flight so memory stays flat
+        pending = set()
+        submitted = 0
+        in_flight = 2 * workers
+        while submitted < chunks or pending:
+            while submitted < chunks and len(pending) < in_flight:
+                pending.add(
+                    executor.submit(
+                        play_chunk,
+                        master_seed,
+                        submitted,
+                        chunk_size,
+                        games,
+                        top,
+                        max_rounds,
+                    )
+                )
+                submitted += 1
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                summary.merge(future.result())
+
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(
+                    f"\r{summary.games}/{games} games, "
+                    f"{summary.games / elapsed:.0f} games/s",
+                    end="",
+                    file=sys.stderr,
+                )
+    if progress:
+        print(file=sys.stderr)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many games of War on all cores.")
+    parser.add_argument("games", type=int, help="number of games to play")
+    parser.add_argument("--seed", type=int, help="master seed, random by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--top", type=int, default=TOP, help="longest games to report")
+    parser.add_argument(
+        "--max-rounds",
+        type=int,
+        default=MAX_ROUNDS,
+        help="stop longer games and count them as draws, 0 for no cap",
+    )
+    parser.add_argument("--quiet", action="store_true", help="hide the progress")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("games must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    max_rounds = args.max_rounds if args.max_rounds > 0 else None
+
+    # the same seed and chunk size give the same results, whatever the workers
+    seed = args.seed
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    print(f"seed: {seed}, chunk size: {args.chunk_size}")
+
+    summary = run(
+        args.games,
+        seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        top=args.top,
+        max_rounds=max_rounds,
+        progress=not args.quiet,
+    )
+    print(summary.report())
+
+
+if __name__ == "__main__":
+    main()
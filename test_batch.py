@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+import batch
+import engine
+
+GAMES: int = 2000
+SEED: int = 1
+# two-sample Kolmogorov-Smirnov critical value at the 0.1% level, the seeds
+# are fixed so this only needs to be loose enough to survive rule-preserving
+# changes to either engine
+KS_LIMIT: float = 1.95 * np.sqrt(2 / GAMES)
+
+
+def ks_statistic(a: np.ndarray, b: np.ndarray) -> float:
+    a, b = np.sort(a), np.sort(b)
+    values = np.union1d(a, b)
+    cdf_a = np.searchsorted(a, values, side="right") / a.size
+    cdf_b = np.searchsorted(b, values, side="right") / b.size
+    return float(np.abs(cdf_a - cdf_b).max())
+
+
+class TestBatchEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.batch = batch.BatchEngine(GAMES, SEED)
+        cls.rounds, cls.winner = cls.batch.run_to_completion()
+
+        games = [engine.Engine(seed).run_to_completion() for seed in range(GAMES)]
+        cls.scalar_rounds = np.array([rounds for rounds, _ in games])
+        cls.scalar_red = np.array([winner == engine.RED for _, winner in games])
+
+    def test_every_game_finishes(self):
+        self.assertTrue(np.isin(self.winner, (batch.BLACK, batch.RED)).all())
+        sizes = self.batch.deck_size[np.arange(GAMES), self.winner]
+        self.assertTrue((sizes == engine.DECK_SIZE).all())
+
+    def test_cards_are_conserved(self):
+        for game in range(GAMES):
+            cards = []
+            for side in (batch.BLACK, batch.RED):
+                head = self.batch.deck_head[game, side]
+                slots = (
+                    head + np.arange(self.batch.deck_size[game, side])
+                ) % batch.SIZE
+                cards.extend(self.batch.decks[game, side, slots])
+                cards.extend(
+                    self.batch.piles[game, side, : self.batch.pile_size[game, side]]
+                )
+            self.assertEqual(sorted(cards), list(range(engine.DECK_SIZE)))
+
+    def test_rounds_match_scalar_engine(self):
+        self.assertLess(ks_statistic(self.rounds, self.scalar_rounds), KS_LIMIT)
+
+    def test_winners_match_scalar_engine(self):
+        red = (self.winner == batch.RED).mean()
+        self.assertAlmostEqual(red, self.scalar_red.mean(), delta=0.05)
+
+    def test_max_rounds_is_a_draw(self):
+        capped = batch.BatchEngine(500, SEED, max_rounds=200)
+        rounds, winner = capped.run_to_completion()
+        self.assertTrue((rounds <= 200).all())
+        self.assertTrue((winner == batch.DRAW).any())
+        self.assertTrue((rounds[winner == batch.DRAW] == 200).all())
+        self.assertTrue((winner != batch.UNFINISHED).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+"""Compact binary traces of games, to replay long games without re-simulating.
+
+A trace file holds many games followed by an index:
+
+    header   MAGIC, VERSION
+    game     GAME header, the deal (52 cards, black deck first), the moves,
+             then the keyframes
+    ...
+    index    one u64 offset per game
+    footer   offset of the index, number of games, MAGIC
+
+The rules are deterministic once the deal is known, except for the shuffle
+of the won cards, so the moves only store those: one byte for the number of
+cards won, then one byte per card in the order they were put under the deck.
+A keyframe is a snapshot of the whole game every `keyframe_every` rounds, so
+seeking only replays the rounds since the closest one.
+"""
+
+import argparse
+import bisect
+import mmap
+import struct
+from collections.abc import Iterator
+
+import engine
+
+MAGIC: bytes = b"WART"
+VERSION: int = 1
+KEYFRAME_EVERY: int = 1000  # rounds between two snapshots
+BUFFER: int = 1 << 20  # bytes buffered before writing to disk
+
+# winner byte of a game
+OUTCOMES: tuple[str, ...] = (engine.BLACK, engine.RED, engine.DRAW, engine.CYCLE)
+
+HEADER = struct.Struct("<4sB")
+# rounds, wars, winner, keyframe_every, moves size, keyframe count
+GAME = struct.Struct("<IIBIII")
+# rounds, wars, moves offset, black deck, red deck, black pile, red pile sizes,
+# then the cards of the four piles in the same order
+KEYFRAME = struct.Struct(f"<III4B{engine.DECK_SIZE}s")
+OFFSET = struct.Struct("<Q")
+FOOTER = struct.Struct("<QI4s")
+
+
+def piles(game: engine.Engine) -> tuple[engine.Pile, ...]:
+    return game.black_deck, game.red_deck, game.black_pile, game.red_pile
+
+
+class Recorder:
+    # stand-in for Engine.random, logs every shuffle it does
+    def __init__(self, random, moves: bytearray):
+        self.random = random
+        self.moves = moves
+
+    def shuffle(self, cards: list[int]) -> None:
+        self.random.shuffle(cards)
+        self.moves.append(len(cards))
+        self.moves.extend(cards)
+
+
+class Player:
+    # stand-in for Engine.random, gives back the recorded shuffles
+    def __init__(self, moves: mmap.mmap, position: int):
+        self.moves = moves
+        self.position = position  # absolute, in the whole trace
+
+    def shuffle(self, cards: list[int]) -> None:
+        size = self.moves[self.position]
+        if size != len(cards):
+            raise ValueError("the trace does not match the replayed game")
+        start = self.position + 1
+        cards[:] = self.moves[start : start + size]
+        self.position = start + size
+
+
+class TraceWriter:
+    def __init__(self, path: str, keyframe_every: int = KEYFRAME_EVERY):
+        self.file = open(path, "wb", buffering=BUFFER)
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.keyframe_every = keyframe_every
+        self.offsets: list[int] = []
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(self, game: engine.Engine, min_rounds: int = 0) -> tuple[int, str]:
+        """Play a fresh game to completion, store it if it lasts min_rounds."""
+        if not game.shuffle:
+            raise ValueError("only games shuffling the won cards can be traced")
+        deal = bytes((*game.black_deck.cards, *game.red_deck.cards))
+        moves = bytearray()
+        keyframes = bytearray()
+        game.random = Recorder(game.random, moves)
+
+        last_keyframe = 0
+        while game.advance():
+            if game.rounds % self.keyframe_every == 0 and game.rounds != last_keyframe:
+                last_keyframe = game.rounds
+                keyframes += self.snapshot(game, len(moves))
+        game.random = game.random.random
+
+        if game.rounds >= min_rounds:
+            self.offsets.append(self.file.tell())
+            self.file.write(
+                GAME.pack(
+                    game.rounds,
+                    game.wars,
+                    OUTCOMES.index(game.winner),
+                    self.keyframe_every,
+                    len(moves),
+                    len(keyframes) // KEYFRAME.size,
+                )
+            )
+            self.file.write(deal)
+            self.file.write(moves)
+            self.file.write(keyframes)
+        return game.rounds, game.winner
+
+    @staticmethod
+    def snapshot(game: engine.Engine, position: int) -> bytes:
+        stacks = piles(game)
+        return KEYFRAME.pack(
+            game.rounds,
+            game.wars,
+            position,
+            *(stack.size for stack in stacks),
+            bytes(card for stack in stacks for card in stack.cards),
+        )
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        index = self.file.tell()
+        for offset in self.offsets:
+            self.file.write(OFFSET.pack(offset))
+        self.file.write(FOOTER.pack(index, len(self.offsets), MAGIC))
+        self.file.close()
+
+
+class Replay:
+    """One recorded game, replayed by an Engine that can seek to any round."""
+
+    def __init__(self, data: mmap.mmap, offset: int):
+        (
+            self.rounds,
+            self.wars,
+            winner,
+            self.keyframe_every,
+            moves,
+            keyframes,
+        ) = GAME.unpack_from(data, offset)
+        self.winner = OUTCOMES[winner]
+
+        self.data = data
+        start = offset + GAME.size
+        self.deal = data[start : start + engine.DECK_SIZE]
+        start += engine.DECK_SIZE
+        self.moves = start  # moves are read straight from the trace
+        start += moves
+        self.keyframes = [
+            KEYFRAME.unpack_from(data, start + i * KEYFRAME.size)
+            for i in range(keyframes)
+        ]
+        self.keyframe_rounds = [keyframe[0] for keyframe in self.keyframes]
+
+        # a game stopped by max_rounds stops at the same round when replayed
+        self.engine = engine.Engine(max_rounds=self.rounds)
+        self.seek(0)
+
+    def restore(self, rounds: int, wars: int, position: int, sizes, cards) -> None:
+        # fill the engine piles in place, renderers keep references to them
+        start = 0
+        for stack, size in zip(piles(self.engine), sizes):
+            stack.cards.clear()
+            stack.cards.extend(cards[start : start + size])
+            start += size
+        self.engine.rounds = rounds
+        self.engine.wars = wars
+        self.engine.winner = None
+        self.engine.random = Player(self.data, self.moves + position)
+
+    def seek(self, rounds: int) -> None:
+        # start from the closest keyframe, then replay the remaining rounds
+        closest = bisect.bisect_right(self.keyframe_rounds, rounds) - 1
+        if closest < 0:
+            half = engine.DECK_SIZE // 2
+            self.restore(0, 0, 0, (half, half, 0, 0), self.deal)
+        else:
+            played, wars, position, *sizes, cards = self.keyframes[closest]
+            self.restore(played, wars, position, sizes, cards)
+        self.engine.check_victory()
+        while self.engine.rounds < rounds and self.engine.advance():
+            pass
+
+
+class TraceReader:
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = HEADER.unpack_from(self.data, 0)
+        index, count, end = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if magic != MAGIC or end != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trace")
+        self.offsets = [
+            OFFSET.unpack_from(self.data, index + i * OFFSET.size)[0]
+            for i in range(count)
+        ]
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[Replay]:
+        return (self.game(i) for i in range(len(self)))
+
+    def game(self, i: int) -> Replay:
+        return Replay(self.data, self.offsets[i])
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay games of War.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record headless games")
+    record.add_argument("path")
+    record.add_argument("--games", type=int, default=1)
+    record.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    record.add_argument("--max-rounds", type=int)
+    record.add_argument("--min-rounds", type=int, default=0, help="skip shorter games")
+    record.add_argument("--keyframe-every", type=int, default=KEYFRAME_EVERY)
+
+    replay = commands.add_parser("replay", help="watch a recorded game")
+    replay.add_argument("path")
+    replay.add_argument("--game", type=int, default=0)
+    replay.add_argument("--seek", type=int, default=0, help="round to start from")
+    replay.add_argument("--speed", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        with TraceWriter(args.path, args.keyframe_every) as writer:
+            for seed in range(args.seed, args.seed + args.games):
+                game = engine.Engine(seed, args.max_rounds)
+                writer.record(game, args.min_rounds)
+            print(f"{len(writer.offsets)} games recorded in {args.path}")
+        return
+
+    import main as renderer  # pygame is only needed to watch a replay
+
+    with TraceReader(args.path) as reader:
+        replay = reader.game(args.game)
+        replay.seek(args.seek)
+        renderer.Game(
+            speed=args.speed, fps=renderer.FPS, simulation=replay.engine
+        ).run()
+
+
+if __name__ == "__main__":
+    main()